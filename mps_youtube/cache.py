@@ -2,7 +2,7 @@ import os
 import pickle
 
 
-from . import g, c, streams
+from . import g, c, pafy, streams
 from .util import dbg
 
 
@@ -30,8 +30,7 @@ def load():
                 g.streams = cached
 
             if 'pafy' in cached:
-                pass
-                #pafy.load_cache(cached['pafy'])
+                pafy.load_cache(cached['pafy'])
 
             dbg(c.g + "%s cached streams imported%s", str(len(g.streams)), c.w)
 
@@ -46,8 +45,8 @@ def save():
     caches = dict(
         version=CACHE_VERSION,
         streams=g.streams,
-        userdata=g.username_query_cache
-        #,pafy=pafy.dump_cache()
+        userdata=g.username_query_cache,
+        pafy=pafy.dump_cache()
     )
 
     with open(g.CACHEFILE, "wb") as cf:
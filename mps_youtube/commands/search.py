@@ -557,26 +557,30 @@ def yt_url(url: str, print_title: bool = False):
 
     g.model.songs = []
 
-    v_ids = set()
+    v_ids = []
     v_title = None
-    for url in url_list:
-        try:
+    try:
+        for url in url_list:
             v_id = pafy.extract_video_id(url)
-            if v_id in v_ids:
-                continue
-            p = pafy.get_video_info(v_id)
-        except (IOError, ValueError, Exception) as e:
-            g.message = c.r + str(e) + c.w
-            g.content = g.content or content.generate_songlist_display(
-                    zeromsg=g.message)
-            return
+            if v_id not in v_ids:
+                v_ids.append(v_id)
+        # fetch metadata for all unique ids in one concurrent batch
+        infos = pafy.get_video_infos(v_ids)
+        for p in infos:
+            if isinstance(p, Exception):
+                raise p
+    except (IOError, ValueError, Exception) as e:
+        g.message = c.r + str(e) + c.w
+        g.content = g.content or content.generate_songlist_display(
+                zeromsg=g.message)
+        return
 
+    for p in infos:
         g.browse_mode = "normal"
         v = Video(p['id'], p['title'], int(p['duration']['secondsText']))
         if p and isinstance(p, dict):
             v_title = p.get("title")
         g.model.songs.append(v)
-        v_ids.add(v_id)
 
     if not g.command_line:
         g.content = content.generate_songlist_display()
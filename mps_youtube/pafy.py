@@ -1,12 +1,28 @@
 import asyncio
-import json
-import os, glob
+import atexit
+import concurrent.futures
+import contextlib
+import functools
+import importlib.util
+import logging
+import os
 import random
 import re
-from urllib.parse import parse_qs, urlparse
+import threading
+import time
+from urllib.parse import unquote_plus, urlparse
 
-import requests
+import httpx
 import yt_dlp
+from yt_dlp.extractor import get_info_extractor
+
+try:
+    # optional, parses the JSON responses several times faster than json
+    from orjson import loads as json_loads
+except ImportError:
+    from json import loads as json_loads
+# py_yt already queries the Innertube JSON API (youtubei/v1) over a shared,
+# gzip-enabled aiohttp session; there is no HTML scraping left to replace.
 from py_yt import VideosSearch, ChannelsSearch, PlaylistsSearch, Suggestions, Playlist, Video, Channel, ChannelSearch
 
 
@@ -34,15 +50,152 @@ class MyLogger:
         print(msg)
 
 
+# Idle YoutubeDL instances keyed by their option tuple. A YoutubeDL can't be
+# shared between threads, so each call checks one out and hands it back when
+# done; instances are reused by whichever thread needs one next, and at most
+# _YDL_POOL_SIZE idle ones are kept per key.
+_YDL_POOL = {}
+_YDL_POOL_SIZE = 4
+_YDL_LOCK = threading.Lock()
+
+
+@contextlib.contextmanager
+def _checkout_ydl(**opts):
+    '''
+    Lends out an idle YoutubeDL instance for the given options, creating one if none is free
+    '''
+    key = tuple(sorted(opts.items()))
+    with _YDL_LOCK:
+        idle = _YDL_POOL.setdefault(key, [])
+        ydl = idle.pop() if idle else None
+    if ydl is None:
+        # only youtube.com is ever queried, so register just the YouTube
+        # extractor instead of the full default list
+        ydl = yt_dlp.YoutubeDL(dict(opts, logger=MyLogger()), auto_init=False)
+        ydl.add_info_extractor(get_info_extractor('Youtube'))
+    try:
+        yield ydl
+    finally:
+        with _YDL_LOCK:
+            if len(idle) < _YDL_POOL_SIZE:
+                idle.append(ydl)
+                ydl = None
+        if ydl is not None:
+            ydl.close()
+
+
+@atexit.register
+def _close_ydl_pool():
+    with _YDL_LOCK:
+        for idle in _YDL_POOL.values():
+            for ydl in idle:
+                ydl.close()
+        _YDL_POOL.clear()
+
+
+# Worker threads for the blocking yt-dlp calls, see the *_async wrappers
+_EXECUTOR = concurrent.futures.ThreadPoolExecutor(max_workers=min(32, (os.cpu_count() or 1) * 4))
+
+
+async def _in_executor(fn, *args):
+    return await asyncio.get_running_loop().run_in_executor(_EXECUTOR, fn, *args)
+
+
+# Results of network lookups keyed by (function name, *args), each stored as
+# (expiry, value). Saved to and restored from the cache file along with the
+# stream cache, see dump_cache() and load_cache().
+_CACHE = {}
+
+
+def _memoize(expire):
+    '''
+    Caches the decorated function's result for expire seconds
+    '''
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args):
+            key = (fn.__name__,) + args
+            hit = _CACHE.get(key)
+            if hit and hit[0] > time.time():
+                return hit[1]
+            value = fn(*args)
+            _CACHE[key] = (time.time() + expire, value)
+            return value
+        return wrapper
+    return decorator
+
+
+def dump_cache():
+    '''
+    Returns the unexpired cache entries, for saving to the cache file
+    '''
+    now = time.time()
+    return {k: v for k, v in _CACHE.items() if v[0] > now}
+
+
+def load_cache(newcache):
+    '''
+    Restores cache entries previously returned by dump_cache. Anything in
+    another shape (the cache file's 'pafy' key also held the old pafy
+    library's cache) is ignored
+    '''
+    if not isinstance(newcache, dict):
+        return
+    for key, entry in newcache.items():
+        if (isinstance(key, tuple) and key and isinstance(key[0], str)
+                and isinstance(entry, tuple) and len(entry) == 2
+                and isinstance(entry[0], (int, float))):
+            _CACHE[key] = entry
+
+
+# Long-lived event loop for the py_yt coroutines. Running each one through
+# asyncio.run() would build (and tear down) a new loop, selector and HTTP
+# session on every call.
+_LOOP = asyncio.new_event_loop()
+_LOOP_THREAD = threading.Thread(target=_LOOP.run_forever, name='pafy-loop', daemon=True)
+_LOOP_THREAD.start()
+atexit.register(lambda: _LOOP.call_soon_threadsafe(_LOOP.stop))
+
+
+def _run(coro):
+    '''
+    Runs coro on the shared event loop and blocks until its result is available
+    '''
+    future = asyncio.run_coroutine_threadsafe(coro, _LOOP)
+    try:
+        return future.result()
+    except KeyboardInterrupt:
+        future.cancel()
+        raise
+
+
+# Shared async HTTP client, used only from _LOOP, so repeated requests reuse
+# pooled keep-alive connections instead of a new DNS lookup and TCP + TLS
+# handshake each time. Lookups are driven by the user browsing, often minutes
+# apart, so idle connections are kept well beyond httpx's 5 second default.
+# HTTP/2 needs the optional h2 package.
+_HTTPX = httpx.AsyncClient(http2=importlib.util.find_spec('h2') is not None, timeout=5,
+                           limits=httpx.Limits(max_connections=32, keepalive_expiry=120))
+atexit.register(lambda: _run(_HTTPX.aclose()))
+
+
 def get_video_streams(ytid):
 
     '''
     given a youtube video id returns different video / audio stream formats' \
     '''
 
-    with yt_dlp.YoutubeDL({'logger':MyLogger()}) as ydl:
+    with _checkout_ydl() as ydl:
         info_dict = ydl.extract_info(ytid, download=False)
-        return [i for i in info_dict['formats'] if i.get('format_note') != 'storyboard']
+    return [i for i in info_dict['formats'] if i.get('format_note') != 'storyboard']
+
+async def get_video_streams_async(ytid):
+    '''
+    get_video_streams run on a worker thread, for use from coroutines
+    '''
+    return await _in_executor(get_video_streams, ytid)
+
+_DOWNLOAD_TMPL = '%(title)s-%(id)s.%(ext)s'
 
 def download_video(ytid, folder, audio_only=False):
 
@@ -51,7 +204,7 @@ def download_video(ytid, folder, audio_only=False):
     '''
 
     ytdl_format_options = {
-        'outtmpl': os.path.join(folder, '%(title)s-%(id)s.%(ext)s')
+        'outtmpl': os.path.join(folder, _DOWNLOAD_TMPL)
     }
     if audio_only:
         ytdl_format_options['format'] = 'bestaudio/best'
@@ -65,6 +218,12 @@ def download_video(ytid, folder, audio_only=False):
         ydl.download('https://www.youtube.com/watch?v=%s' % ytid)
         return True
 
+async def download_video_async(ytid, folder, audio_only=False):
+    '''
+    download_video run on a worker thread, for use from coroutines
+    '''
+    return await _in_executor(download_video, ytid, folder, audio_only)
+
 def search_videos(query, pages):
     '''
     Given a keyword / query this function will return youtube video results against those keywords / query
@@ -73,16 +232,19 @@ def search_videos(query, pages):
         videosSearch = VideosSearch(query, limit=50)
         result = await videosSearch.next()
         wdata = result.get('result', []) if result else []
+        # pages are chained through continuation tokens, see get_playlist
         for i in range(pages-1):
             try:
                 result = await videosSearch.next()
                 if result and 'result' in result:
                     wdata.extend(result['result'])
-            except:
+            except Exception as e:
+                # py_yt reports failed requests as a plain Exception
+                logging.debug('search_videos: stopped after %s pages: %s', i + 1, e)
                 break
         return wdata
     
-    return asyncio.run(_async_search())
+    return _run(_async_search())
 
 
 def channel_search(query):
@@ -94,7 +256,7 @@ def channel_search(query):
         result = await channelsSearch.next()
         return result['result']
     
-    return asyncio.run(_async_search())
+    return _run(_async_search())
 
 def playlist_search(query):
     '''
@@ -105,7 +267,7 @@ def playlist_search(query):
         result = await playlistsSearch.next()
         return result['result']
     
-    return asyncio.run(_async_search())
+    return _run(_async_search())
 
 def get_playlist(playlist_id):
     '''
@@ -113,11 +275,14 @@ def get_playlist(playlist_id):
     '''
     async def _async_get():
         playlist = await Playlist.get('https://www.youtube.com/playlist?list=%s' % playlist_id)
+        # Each continuation token only arrives with the previous page, so pages
+        # can't be requested ahead of time; latency is kept down by the shared
+        # loop (and its pooled connections) rather than by fanning out.
         while playlist.hasMoreVideos:
             await playlist.getNextVideos()
         return playlist
     
-    return asyncio.run(_async_get())
+    return _run(_async_get())
 
 def get_video_title_suggestions(query):
     '''
@@ -128,7 +293,7 @@ def get_video_title_suggestions(query):
         related_searches = result['result']
         return related_searches[random.randint(0, len(related_searches) - 1)] if related_searches else query
     
-    return asyncio.run(_async_get())
+    return _run(_async_get())
 
 def channel_id_from_name(query):
     channel_info = channel_search(query)[0]
@@ -136,20 +301,41 @@ def channel_id_from_name(query):
     channel_name = channel_info['title']
     return (channel_id, channel_name)
 
+async def _iter_channel(channel_id, key, has_more):
+    '''
+    Yields the items of channel.result[key] as each page arrives. Depending on
+    its version py_yt either replaces that list per page or appends each page
+    to it, so only the items that haven't been yielded yet are produced
+    '''
+    channel = Channel(channel_id)
+    await channel.init()
+    items, seen = None, 0
+    while True:
+        page = channel.result.get(key, [])
+        if page is not items:
+            items, seen = page, 0
+        for item in items[seen:]:
+            yield item
+        seen = len(items)
+        # pages are chained through continuation tokens, see get_playlist
+        if not getattr(channel, has_more)():
+            break
+        await channel.next()
+
+def iter_videos_from_channel(channel_id):
+    '''
+    Yields the videos of a channel identified by channel_id as each page arrives
+    '''
+    return _iter_channel(channel_id, 'videos', 'has_more_videos')
+
 def all_videos_from_channel(channel_id):
     '''
     Get all videos from a channel identified by channel_id
     '''
     async def _async_get():
-        channel = Channel(channel_id)
-        await channel.init()
-        videos = channel.result.get('videos', [])
-        while channel.has_more_videos():
-            await channel.next()
-            videos.extend(channel.result.get('videos', []))
-        return videos
+        return [video async for video in iter_videos_from_channel(channel_id)]
     
-    return asyncio.run(_async_get())
+    return _run(_async_get())
 
 def search_videos_from_channel(channel_id, query):
     '''
@@ -160,41 +346,122 @@ def search_videos_from_channel(channel_id, query):
         result = await search.next()
         return result
     
-    return asyncio.run(_async_search())
+    return _run(_async_search())
 
 def get_comments(video_id):
     '''
     Get comments for a video using yt-dlp
     '''
     try:
-        with yt_dlp.YoutubeDL({'logger': MyLogger(), 'getcomments': True, 'skip_download': True}) as ydl:
+        with _checkout_ydl(getcomments=True, skip_download=True) as ydl:
             info = ydl.extract_info(f'https://www.youtube.com/watch?v={video_id}', download=False)
-            comments = info.get('comments', [])
-            # Format to match expected structure
-            return [{'text': c.get('text', ''), 'author': c.get('author', ''), 'time': c.get('timestamp', 0)} for c in comments]
-    except Exception as e:
+        comments = info.get('comments', [])
+        # Format to match expected structure
+        return [{'text': c.get('text', ''), 'author': c.get('author', ''), 'time': c.get('timestamp', 0)} for c in comments]
+    except yt_dlp.utils.DownloadError:
         return []
 
-def get_video_info(video_id):
+async def get_comments_async(video_id):
     '''
-    Get detailed information about a video
+    get_comments run on a worker thread, for use from coroutines
     '''
-    async def _async_get():
+    return await _in_executor(get_comments, video_id)
+
+_MAX_CONCURRENT_INFOS = 8
+
+def get_video_infos(video_ids):
+    '''
+    Get detailed information about several videos, fetching them concurrently.
+    Results are returned in the order of video_ids; a video that could not be
+    fetched is represented by the exception raised for it
+    '''
+    async def _async_get(limit, video_id):
         try:
-            videoInfo = await Video.getInfo(video_id)
-            response = return_dislikes(video_id)
+            async with limit:
+                videoInfo, response = await asyncio.gather(Video.getInfo(video_id),
+                                                           _retry(_dislikes_async, video_id))
             videoInfo['likes'] = response['likes']
             videoInfo['dislikes'] = response['dislikes']
             videoInfo['averageRating'] = response['rating']
             return videoInfo
-        except:
+        except Exception:
+            # py_yt signals failed requests with a plain Exception
             raise Exception("Can't get video info. Video is either private or unavailable in your country.")
-    
-    return asyncio.run(_async_get())
 
+    async def _gather(missing):
+        # a pasted list of links can hold hundreds of ids; bound the number of
+        # simultaneous Innertube requests so YouTube doesn't start answering 429
+        limit = asyncio.Semaphore(_MAX_CONCURRENT_INFOS)
+        return await asyncio.gather(*(_async_get(limit, v) for v in missing),
+                                    return_exceptions=True)
+
+    now = time.time()
+    infos = {}
+    for video_id in video_ids:
+        hit = _CACHE.get(('get_video_info', video_id))
+        if hit and hit[0] > now:
+            infos[video_id] = hit[1]
+
+    missing = [v for v in dict.fromkeys(video_ids) if v not in infos]
+    if missing:
+        for video_id, info in zip(missing, _run(_gather(missing))):
+            infos[video_id] = info
+            if not isinstance(info, Exception):
+                _CACHE[('get_video_info', video_id)] = (now + 86400, info)
+
+    return [infos[v] for v in video_ids]
+
+def get_video_info(video_id):
+    '''
+    Get detailed information about a video, cached for a day
+    '''
+    info = get_video_infos([video_id])[0]
+    if isinstance(info, Exception):
+        raise info
+    return info
+
+_DISLIKES_URL = 'https://returnyoutubedislikeapi.com/votes?videoId='
+
+@_memoize(3600)
 def return_dislikes(video_id):
-    return json.loads(requests.get('https://returnyoutubedislikeapi.com/votes?videoId=' + video_id).text)
+    return _run(_retry(_dislikes_async, video_id))
+
+async def _dislikes_async(video_id):
+    response = await _HTTPX.get(_DISLIKES_URL + video_id)
+    response.raise_for_status()
+    return json_loads(response.content)
+
+async def _retry(fn, *args, tries=2, backoff=0.2):
+    '''
+    Awaits fn(*args), retrying timeouts, connection errors and 5xx responses
+    after a short backoff. Client errors (4xx) are raised straight away
+    '''
+    for attempt in range(1, tries + 1):
+        try:
+            return await fn(*args)
+        except httpx.HTTPStatusError as e:
+            if e.response.status_code < 500 or attempt == tries:
+                raise
+        except httpx.TransportError:
+            if attempt == tries:
+                raise
+        await asyncio.sleep(backoff * attempt)
+
+
+_ID_RE = re.compile(r'[\w-]{11}')
+_YT_HOSTS = frozenset({'youtube.com', 'www.youtube.com', 'm.youtube.com', 'gaming.youtube.com'})
+_YTBE_HOSTS = frozenset({'youtu.be', 'www.youtu.be'})
 
+def _query_v(query):
+    '''
+    Returns the first non-empty v parameter of a query string, as parse_qs
+    would, without building a dict of every parameter
+    '''
+    for part in query.split('&'):
+        key, _, value = part.partition('=')
+        if value and (key == 'v' or ('%' in key or '+' in key) and unquote_plus(key) == 'v'):
+            return unquote_plus(value) if '%' in value or '+' in value else value
+    return None
 
 def extract_video_id(url: str) -> str:
     """Extract the video id from a url, return video id as str.
@@ -216,41 +483,78 @@ def extract_video_id(url: str) -> str:
         >>> extract_video_id('https://youtu.be/LDU_Txk06tM')
         LDU_Txk06tM
     """
-    idregx = re.compile(r'[\w-]{11}$')
     url = str(url).strip()
 
-    if idregx.match(url):
+    if len(url) == 11 and _ID_RE.fullmatch(url):
         return url # ID of video
 
     if '://' not in url:
         url = '//' + url
+
+    # Fast path for the common https://youtu.be/ID and .../watch?v=ID shapes.
+    # Anything it doesn't fully recognise is left to urlparse below.
+    if url.startswith(('https://', 'http://', '//')) and ';' not in url:
+        netloc, _, tail = url.split('//', 1)[1].partition('/')
+        netloc = netloc.lower()
+        if netloc in _YTBE_HOSTS:
+            vidid = tail.split('?', 1)[0].split('#', 1)[0].rsplit('/', 1)[-1]
+            if _ID_RE.fullmatch(vidid):
+                return vidid
+        elif netloc in _YT_HOSTS:
+            vidid = _query_v(tail.partition('#')[0].partition('?')[2])
+            if vidid and _ID_RE.fullmatch(vidid):
+                return vidid
+
     parsedurl = urlparse(url)
-    if parsedurl.netloc in ('youtube.com', 'www.youtube.com', 'm.youtube.com', 'gaming.youtube.com'):
-        query = parse_qs(parsedurl.query)
-        if 'v' in query and idregx.match(query['v'][0]):
-            return query['v'][0]
-    elif parsedurl.netloc in ('youtu.be', 'www.youtu.be'):
+    netloc = parsedurl.netloc.lower()
+    if netloc in _YT_HOSTS:
+        vidid = _query_v(parsedurl.query)
+        if vidid and _ID_RE.fullmatch(vidid):
+            return vidid
+    elif netloc in _YTBE_HOSTS:
         vidid = parsedurl.path.split('/')[-1] if parsedurl.path else ''
-        if idregx.match(vidid):
+        if _ID_RE.fullmatch(vidid):
             return vidid
 
     err = "Need 11 character video id or the URL of the video. Got %s"
     raise ValueError(err % url)
 
+def iter_playlists_from_channel(channel_id):
+    '''
+    Yields the playlists of a channel as each page arrives
+    '''
+    return _iter_channel(channel_id, 'playlists', 'has_more_playlists')
+
 def all_playlists_from_channel(channel_id):
     '''
     Get all playlists from a channel
     '''
     async def _async_get():
-        channel = Channel(channel_id)
-        await channel.init()
-        playlists = channel.result.get('playlists', [])
-        while channel.has_more_playlists():
-            await channel.next()
-            playlists.extend(channel.result.get('playlists', []))
-        return playlists
+        return [playlist async for playlist in iter_playlists_from_channel(channel_id)]
     
-    return asyncio.run(_async_get())
+    return _run(_async_get())
+
+_SUBTITLE_EXPIRY = 30 * 86400
+
+# ytid -> .vtt path for each subtitles directory, listed once per process
+_SUBTITLE_INDEX = {}
+
+def _existing_subtitle(subdir, ytid):
+    '''
+    Returns the path of an already downloaded subtitle for ytid in subdir, if any
+    '''
+    index = _SUBTITLE_INDEX.get(subdir)
+    if index is None:
+        index = _SUBTITLE_INDEX[subdir] = {}
+        try:
+            with os.scandir(subdir) as entries:
+                for entry in entries:
+                    if entry.name.endswith('.vtt'):
+                        index.setdefault(entry.name.split('.', 1)[0], entry.path)
+        except FileNotFoundError:
+            pass
+    path = index.get(ytid)
+    return path if path and os.path.isfile(path) else None
 
 def get_subtitles(ytid, output_dir):
     '''
@@ -260,26 +564,26 @@ def get_subtitles(ytid, output_dir):
     2. Select auto generated 'en' subtitles
     '''
 
-    if output_dir.endswith('/'):
-        output_dir = output_dir[:-1]
-    outtmpl = f'{output_dir}/subtitles/{ytid}'
+    output_dir = output_dir.rstrip('/')
+    subdir = f'{output_dir}/subtitles'
+    outtmpl = f'{subdir}/{ytid}'
     # check if subtitles already exist
-    existing_subtitles = glob.glob(os.path.join(outtmpl+'*.vtt'))
-    if existing_subtitles:
-        return existing_subtitles[0]
+    key = ('get_subtitles', ytid, output_dir)
+    cached = _CACHE.get(key)
+    if cached and os.path.isfile(cached[1]):
+        return cached[1]
+    existing_subtitle = _existing_subtitle(subdir, ytid)
+    if existing_subtitle:
+        _CACHE[key] = (time.time() + _SUBTITLE_EXPIRY, existing_subtitle)
+        return existing_subtitle
 
     url = f'https://www.youtube.com/watch?v={ytid}'
-    ydl_opts = {
-        'skip_download': True,
-        'writesubtitles': True,
-        'writeautomaticsub': True,
-        'subtitlesformat': 'vtt',
-        'outtmpl': outtmpl,
-        'logger': MyLogger(print_info=False),
-    }
-    # Create a YoutubeDL instance with the options
-    with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-        info_dict = ydl.extract_info(url, download=False)
+    # outtmpl is templated on the id so one instance serves every video
+    with _checkout_ydl(skip_download=True, writesubtitles=True, writeautomaticsub=True,
+                       subtitlesformat='vtt', outtmpl=f'{subdir}/%(id)s') as ydl:
+        # extract without processing so the result can be processed once the
+        # language is known, instead of extracting the video a second time
+        info_dict = ydl.extract_info(url, download=False, process=False)
         subtitles = info_dict.get('subtitles', {})
         available_formats = list(subtitles.keys())
         if available_formats:
@@ -287,11 +591,16 @@ def get_subtitles(ytid, output_dir):
         else:
             lang = 'en' # otherwise use english auto-generated subtitles
         ydl.params['subtitleslangs'] = [lang]
-        # Add the new options to the existing ydl_opts dictionary
-        ydl.add_default_info_extractors()
-        # Create a new yt-dlp object with the updated ydl_opts dictionary
-        ydl = yt_dlp.YoutubeDL(ydl_opts)
         # Download the subtitle
-        ydl.download([url])
-        path = f'{outtmpl}.{lang}.vtt'
-        return path if os.path.isfile(path) else None
\ No newline at end of file
+        ydl.process_ie_result(info_dict, download=True)
+    path = f'{outtmpl}.{lang}.vtt'
+    if not os.path.isfile(path):
+        return None
+    _CACHE[key] = (time.time() + _SUBTITLE_EXPIRY, path)
+    return path
+
+async def get_subtitles_async(ytid, output_dir):
+    '''
+    get_subtitles run on a worker thread, for use from coroutines
+    '''
+    return await _in_executor(get_subtitles, ytid, output_dir)
@@ -0,0 +1,239 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+import asyncio
+import threading
+
+import httpx
+import pytest
+
+import mps_youtube.pafy as pafy
+
+
+@pytest.mark.parametrize(
+    "url,exp_res",
+    (
+        ("LDU_Txk06tM", "LDU_Txk06tM"),
+        (" LDU_Txk06tM\n", "LDU_Txk06tM"),
+        ("https://www.youtube.com/watch?v=LDU_Txk06tM", "LDU_Txk06tM"),
+        ("https://m.youtube.com/watch?feature=share&v=LDU_Txk06tM&t=10", "LDU_Txk06tM"),
+        ("youtube.com/watch?v=LDU_Txk06tM#t=10", "LDU_Txk06tM"),
+        ("https://www.youtube.com/watch?v=LDU%5FTxk06tM", "LDU_Txk06tM"),
+        ("https://www.youtube.com/watch?v=&list=PL1&v=LDU_Txk06tM", "LDU_Txk06tM"),
+        ("https://youtu.be/LDU_Txk06tM", "LDU_Txk06tM"),
+        ("http://www.youtu.be/LDU_Txk06tM?t=10", "LDU_Txk06tM"),
+        ("youtu.be/LDU_Txk06tM", "LDU_Txk06tM"),
+        ("https://WWW.YouTube.com/watch?v=LDU_Txk06tM", "LDU_Txk06tM"),
+        ("https://Youtu.be/LDU_Txk06tM", "LDU_Txk06tM"),
+        ("https://youtu.be/LDU_Txk06tM\n?t=1", "LDU_Txk06tM"),
+        ("https://www.youtube.com/watch?v=LDU_Txk06tM\n&t=1", "LDU_Txk06tM"),
+    ),
+)
+def test_extract_video_id(url, exp_res):
+    assert pafy.extract_video_id(url) == exp_res
+
+
+@pytest.mark.parametrize(
+    "url",
+    (
+        "http://example.com",
+        "LDU_Txk06t",
+        "https://example.com/watch?v=LDU_Txk06tM",
+        "https://www.youtube.com/watch?v=LDU_Txk06tMx",
+        "https://youtu.be/",
+        "https://www.youtube.com/watch#x?v=LDU_Txk06tM",
+    ),
+)
+def test_extract_video_id_invalid(url):
+    with pytest.raises(ValueError):
+        pafy.extract_video_id(url)
+
+
+class _StubChannel:
+    """ Channel serving three pages, either appending to or replacing result """
+
+    pages = [['a', 'b'], ['c'], ['d']]
+    append = True
+
+    def __init__(self, channel_id):
+        self.remaining = list(self.pages)
+        self.result = {}
+
+    def _load(self):
+        page = self.remaining.pop(0)
+        if self.append:
+            self.result.setdefault('videos', []).extend(page)
+            self.result.setdefault('playlists', []).extend(page)
+        else:
+            self.result = {'videos': list(page), 'playlists': list(page)}
+
+    async def init(self):
+        self._load()
+
+    async def next(self):
+        self._load()
+
+    def has_more_videos(self):
+        return bool(self.remaining)
+
+    has_more_playlists = has_more_videos
+
+
+@pytest.mark.parametrize("append", (True, False))
+def test_channel_pages_not_repeated(monkeypatch, append):
+    monkeypatch.setattr(_StubChannel, 'append', append)
+    monkeypatch.setattr(pafy, 'Channel', _StubChannel)
+    assert pafy.all_videos_from_channel('x') == ['a', 'b', 'c', 'd']
+    assert pafy.all_playlists_from_channel('x') == ['a', 'b', 'c', 'd']
+
+
+def test_ydl_pool_reused_across_threads():
+    seen = []
+
+    def use():
+        with pafy._checkout_ydl(skip_download=True, test_pool=True) as ydl:
+            seen.append(ydl)
+
+    for _ in range(5):
+        t = threading.Thread(target=use)
+        t.start()
+        t.join()
+
+    # short-lived threads share one instance instead of each building their own
+    assert len(set(map(id, seen))) == 1
+    key = (('skip_download', True), ('test_pool', True))
+    assert len(pafy._YDL_POOL[key]) == 1
+
+
+def test_ydl_pool_bounded():
+    held = []
+    with pafy._checkout_ydl(test_bound=True) as a, pafy._checkout_ydl(test_bound=True) as b:
+        held.extend((a, b))
+    assert held[0] is not held[1]
+    exits = [pafy._checkout_ydl(test_bound=True) for _ in range(pafy._YDL_POOL_SIZE + 2)]
+    for cm in exits:
+        cm.__enter__()
+    for cm in exits:
+        cm.__exit__(None, None, None)
+    assert len(pafy._YDL_POOL[(('test_bound', True),)]) == pafy._YDL_POOL_SIZE
+
+
+def test_memoize(monkeypatch):
+    monkeypatch.setattr(pafy, '_CACHE', {})
+    now = [1000.0]
+    monkeypatch.setattr(pafy.time, 'time', lambda: now[0])
+    calls = []
+
+    @pafy._memoize(60)
+    def lookup(x):
+        calls.append(x)
+        return x * 2
+
+    assert lookup(2) == 4
+    assert lookup(2) == 4
+    assert lookup(3) == 6
+    assert calls == [2, 3]
+    now[0] += 61
+    assert lookup(2) == 4
+    assert calls == [2, 3, 2]
+
+
+def test_dump_and_load_cache(monkeypatch):
+    monkeypatch.setattr(pafy, '_CACHE', {})
+    now = pafy.time.time()
+    pafy._CACHE[('lookup', 'fresh')] = (now + 60, 'a')
+    pafy._CACHE[('lookup', 'stale')] = (now - 60, 'b')
+    dumped = pafy.dump_cache()
+    assert dumped == {('lookup', 'fresh'): (now + 60, 'a')}
+
+    pafy._CACHE.clear()
+    pafy.load_cache(dumped)
+    assert pafy._CACHE == dumped
+
+
+@pytest.mark.parametrize(
+    "cached",
+    (
+        None,
+        ['not', 'a', 'dict'],
+        {'legacy': {'url': 'data'}},
+        {('lookup', 'x'): 'no expiry'},
+        {('lookup', 'x'): ('soon', 'value')},
+        {(): (1.0, 'value')},
+    ),
+)
+def test_load_cache_ignores_foreign_entries(monkeypatch, cached):
+    monkeypatch.setattr(pafy, '_CACHE', {})
+    pafy.load_cache(cached)
+    assert pafy._CACHE == {}
+    assert pafy.dump_cache() == {}
+
+
+def test_get_video_infos_bounded(monkeypatch):
+    monkeypatch.setattr(pafy, '_CACHE', {})
+    running = [0, 0]
+
+    class StubVideo:
+        @staticmethod
+        async def getInfo(video_id):
+            running[0] += 1
+            running[1] = max(running)
+            await asyncio.sleep(0.01)
+            running[0] -= 1
+            if video_id == 'bad':
+                raise KeyError(video_id)
+            return {'id': video_id}
+
+    async def dislikes(video_id):
+        return {'likes': 1, 'dislikes': 2, 'rating': 3}
+
+    monkeypatch.setattr(pafy, 'Video', StubVideo)
+    monkeypatch.setattr(pafy, '_dislikes_async', dislikes)
+    ids = ['v%d' % i for i in range(30)] + ['bad']
+    infos = pafy.get_video_infos(ids)
+
+    assert running[1] == pafy._MAX_CONCURRENT_INFOS
+    assert [i['id'] for i in infos[:-1]] == ids[:-1]
+    assert infos[0]['likes'] == 1
+    assert isinstance(infos[-1], Exception)
+
+
+def _failing(errors):
+    """ Coroutine function raising each of errors in turn, then returning 'ok' """
+    calls = []
+
+    async def fetch():
+        calls.append(len(calls))
+        if len(calls) <= len(errors):
+            error = errors[len(calls) - 1]
+            request = httpx.Request('GET', 'https://returnyoutubedislikeapi.com/votes')
+            if isinstance(error, int):
+                raise httpx.HTTPStatusError('status', request=request,
+                                            response=httpx.Response(error, request=request))
+            raise error('failed', request=request)
+        return 'ok'
+
+    return fetch, calls
+
+
+@pytest.mark.parametrize("error", (503, 500, "connect"))
+def test_retry_transient_errors(error):
+    error = httpx.ConnectError if error == "connect" else error
+    fetch, calls = _failing([error])
+    assert pafy._run(pafy._retry(fetch, backoff=0)) == 'ok'
+    assert len(calls) == 2
+
+
+def test_retry_bails_on_client_error():
+    fetch, calls = _failing([404])
+    with pytest.raises(httpx.HTTPStatusError):
+        pafy._run(pafy._retry(fetch, backoff=0))
+    assert len(calls) == 1
+
+
+@pytest.mark.parametrize("errors", ([503, 503], [503, "connect"]))
+def test_retry_reraises_after_last_attempt(errors):
+    errors = [httpx.ConnectError if e == "connect" else e for e in errors]
+    fetch, calls = _failing(errors)
+    with pytest.raises((httpx.HTTPStatusError, httpx.ConnectError)):
+        pafy._run(pafy._retry(fetch, backoff=0))
+    assert len(calls) == 2